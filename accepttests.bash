@@ -8,4 +8,7 @@ cp test1merge.xlsx     test1merge-expected.xlsx
 cp test1replace.xlsx   test1replace-expected.xlsx
 cp test1ignore.xlsx    test1ignore-expected.xlsx
 cp test1diff.xlsx      test1diff-expected.xlsx
-
+cp test4data.xlsx      test4data-expected.xlsx
+cp test4other.xlsx     test4other-expected.xlsx
+cp test4merge.xlsx     test4merge-expected.xlsx
+cp test5merge.xlsx     test5merge-expected.xlsx
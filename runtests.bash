@@ -18,6 +18,13 @@
 # newAppend test:
   xltablediff.py  --key ID --newAppend test1old.xlsx test1new.xlsx --out test1newAppend.xlsx
 
+# Sheet tests, with a chartsheet ahead of the data sheets:
+  xltablediff.py  --sheet Data --key ID test4old.xlsx test4new.xlsx --out test4data.xlsx
+  xltablediff.py  --sheet Other --key Key test4old.xlsx test4new.xlsx --out test4other.xlsx
+  xltablediff.py  --sheet Data --key ID --mergeAll test4old.xlsx test4new.xlsx --out test4merge.xlsx
+
+# maxColumns test, with columns past column 100 to be trimmed:
+  xltablediff.py  --key ID --merge C100 test5old.xlsx test5new.xlsx --out test5merge.xlsx
 
 echo '========================================================='
 echo 'Comparing expected vs new results...'
@@ -28,4 +35,7 @@ xltablediff.py  test1merge-expected.xlsx test1merge.xlsx --out /dev/null
 xltablediff.py  test1replace-expected.xlsx test1replace.xlsx --out /dev/null
 xltablediff.py  test1oldAppend-expected.xlsx test1oldAppend.xlsx --out /dev/null
 xltablediff.py  test1newAppend-expected.xlsx test1newAppend.xlsx --out /dev/null
-
+xltablediff.py  test4data-expected.xlsx test4data.xlsx --out /dev/null
+xltablediff.py  test4other-expected.xlsx test4other.xlsx --out /dev/null
+xltablediff.py  --sheet Data test4merge-expected.xlsx test4merge.xlsx --out /dev/null
+xltablediff.py  test5merge-expected.xlsx test5merge.xlsx --out /dev/null
@@ -119,13 +119,16 @@ import os
 import os.path
 import openpyxl
 from openpyxl.styles import PatternFill, Fill, Font
-import re
+from openpyxl.cell import Cell, WriteOnlyCell
+from openpyxl.utils.cell import get_column_letter
 import json
 import pprint
 import inspect
 import keyword
 import argparse
 import copy
+import operator
+from bisect import bisect_left
 
 ##################### Globals #####################
 verbose = False
@@ -140,51 +143,42 @@ fillAddCol =    PatternFill("solid", fgColor="CCFFC2")
 fillKeyCol =    PatternFill("solid", fgColor="E8E8FF")
 fillIgnore =    PatternFill("solid", fgColor="E0E0E0")
 
-##################### NoTabs #####################
-def NoTabs(rows):
-    ''' Change tabs to spaces in all cells.
-    Modifies the given rows of values in place.
-    '''
-    for i in range(len(rows)):
-        row = rows[i]
-        for j in range(len(row)):
-            row[j] = row[j].replace("\t", " ")
-    return rows
-
-##################### TrimAndPad #####################
-def TrimAndPad(rows):
-    ''' Trim trailing empty rows and columns, and pad
-    every row to have the same number of values.
-    Modifies the given rows of values in place.
+##################### CleanRows #####################
+def CleanRows(valuesRows):
+    ''' Make rows of strings from the given rows of cell values,
+    in a single pass.  Values are trimmed and tabs are changed to spaces.
+    Trailing empty rows and columns are removed, and every row is 
+    padded to have the same number of values.
+    Returns the new list of rows.
     '''
+    rows = []
     iLastRow = -1
     jLastColumn = -1
-    for i in range(len(rows)):
-        row = rows[i]
-        # Look for the last non-empty cell in the row:
-        jLastThisRow = -1
-        for j in range(len(row)-1, -1, -1):
-            if row[j]:
-                jLastThisRow = j
-                if j > jLastColumn:
-                    jLastColumn = j
-                break
-        if jLastThisRow >= 0:
-            iLastRow = i
-            if jLastThisRow > jLastColumn:
-                jLastColumn = jLastThisRow
+    intern = sys.intern
+    for valuesRow in valuesRows:
+        # str.replace is much faster than str.translate when (as usual)
+        # there is no tab to replace.
+        # Values are interned, so that repeated values share one string,
+        # and equal old and new values compare by identity.
+        row = [ ('' if v is None else intern(str(v).strip().replace("\t", " "))) for v in valuesRow ]
+        if any(row):
+            iLastRow = len(rows)
+            # Only cells after jLastColumn can extend the last column, 
+            # so look for the last non-empty cell only if there is one:
+            if any(row[jLastColumn+1 : ]):
+                jLastColumn = len(row) - 1 - next(k for k, v in enumerate(reversed(row)) if v)
+        rows.append(row)
     nRows = iLastRow + 1
     nColumns = jLastColumn + 1
     del rows[nRows : ]
     # Now pad (or trim) each row to the max number of non-empty columns.
-    for i in range(nRows):
-        row = rows[i]
+    for row in rows:
         if len(row) > nColumns:
             # Trim a row with extra cells:
             del row[ nColumns : ]
-        # Pad a row with too few cells:
-        padding = [ "" for j in range(len(row), nColumns) ]
-        row.extend(padding)
+        else:
+            # Pad a row with too few cells:
+            row.extend( [ "" ] * (nColumns - len(row)) )
     return rows
 
 ##################### GuessHeaderRow #####################
@@ -205,36 +199,45 @@ def GuessHeaderRow(rows, key, title):
         row = rows[r]
         # Info(f"Sheet '{title}' row {r+1}: {repr(row)}\n")
         # Info(f"Processing sheet '{title}' row: {r+1}\n")
-        nValues = next( (j for j,v in enumerate(row ) if v == ''), len(row) )
-        # Info(f"nValues: {repr(nValues)}\n")
-        if nValues != nColumns: continue
+        # Every row has nColumns values, so a row with no empty
+        # value is entirely non-empty.
+        if '' in row: continue
         if key and key not in row: continue
+        # Few rows get this far, and set() is faster than an early-exit
+        # python loop for rows that really are unique:
         nSetItems = len(set(row))
-        if nSetItems != nValues:
+        if nSetItems != nColumns:
             # Cannot be a header row, because the values are not unique.
             continue
         # Stop at the first qualifying row
-        headers = row.copy()
+        headers = row
         iHeaders = r
         break
     possibleKeys = []
     if iHeaders is not None:
         # sys.stderr.write(f"headers: {repr(headers)}\n")
         # Collect possibleKeys.
-        for j in range(len(headers)):
-            colValues = set()
-            # Disqualify the column if it contains duplicate keys
-            # before the first empty cell (which would indicate the end
-            # of the table).
-            dupeFound = None
-            for i in range(iHeaders+1, len(rows)):
-                v = rows[i][j]
-                if v == '': break
-                if v in colValues:
-                    dupeFound = True
-                    break
-                colValues.add(v)
-            if not dupeFound: possibleKeys.append(headers[j])
+        # Disqualify a column if it contains duplicate keys
+        # before its first empty cell (which would indicate the end
+        # of the table).  All columns are checked together, row by row.
+        colValues = [ set() for h in headers ]
+        dupeFound = [ False for h in headers ]
+        # jScanning lists the columns with no empty cell or duplicate yet:
+        jScanning = list(range(len(headers)))
+        for i in range(iHeaders+1, len(rows)):
+            if not jScanning: break
+            row = rows[i]
+            jStillScanning = []
+            for j in jScanning:
+                v = row[j]
+                if v == '': continue
+                if v in colValues[j]:
+                    dupeFound[j] = True
+                    continue
+                colValues[j].add(v)
+                jStillScanning.append(j)
+            jScanning = jStillScanning
+        possibleKeys = [ h for j, h in enumerate(headers) if not dupeFound[j] ]
     # sys.stderr.write(f"possibleKeys: {repr(possibleKeys)}\n")
     return iHeaders, possibleKeys
 
@@ -255,14 +258,27 @@ def UniqueName(header, headerSet):
     headerSet.add(h)
     return h
 
+##################### HeaderIndex #####################
+def HeaderIndex(headers):
+    ''' Return a dict that maps each of the given headers to its 0-based
+    column index.  The headers of a table are unique (see GuessHeaderRow).
+    '''
+    return { h: j for j, h in enumerate(headers) }
+
 ##################### LoadWorkBook #####################
-def LoadWorkBook(file, data_only=True):
+def LoadWorkBook(file, data_only=True, read_only=False):
     ''' Read a .xlsx file and return the workbook.
+    If read_only is True, the sheets are streamed from the file
+    instead of being loaded into memory, so the workbook cannot be 
+    modified or saved, and it should be closed when no longer needed.
     '''
     wb = None
     try:
         Info(f"Reading file: '{file}'\n")
-        wb = openpyxl.load_workbook(file, data_only) 
+        # A read-only workbook is never saved, so there is no need
+        # to read its links to external workbooks.
+        wb = openpyxl.load_workbook(file, read_only=read_only, data_only=data_only,
+            keep_links=(not read_only))
     except ValueError as e:
         s = str(e)
         # Info(f"Caught exception: '{s}'\n")
@@ -271,6 +287,24 @@ def LoadWorkBook(file, data_only=True):
         raise Exception(f"{str(e)}")
     return wb
 
+##################### ReadOnlySheetValues #####################
+def ReadOnlySheetValues(sheet, maxColumns, filename):
+    ''' Generate the rows of values of a read-only sheet, without
+    any columns after maxColumns.  Like TrimSheet, raises an exception 
+    if either of the two columns after maxColumns is non-empty.
+    '''
+    # The dimensions recorded in the file may be wrong, so let the
+    # rows be as long as they really are.
+    sheet.reset_dimensions()
+    for valuesRow in sheet.iter_rows(values_only=True):
+        if maxColumns and len(valuesRow) > maxColumns:
+            for j in range(maxColumns, min(maxColumns+2, len(valuesRow))):
+                if valuesRow[j] is not None and str(valuesRow[j]).strip() != '':
+                    letter = get_column_letter(j+1)
+                    raise Exception(f"Non-empty column {letter} ({j+1}) found with --maxColumns={maxColumns} \n  in sheet '{sheet.title}' file '{filename}'.\n  Either delete extra columns or set maxColumns higher.")
+            valuesRow = valuesRow[ : maxColumns]
+        yield valuesRow
+
 ##################### FindTable #####################
 def FindTable(wb, wantedTitle, key, file, maxColumns):
     ''' Read a workbook wb and possibly a wantedTitle, find the desired table.
@@ -293,21 +327,27 @@ def FindTable(wb, wantedTitle, key, file, maxColumns):
     title = ""
     possibleKeys = []
     allPossibleKeys = set()
-    for s in wb:
+    sheets = wb.worksheets
+    if wantedTitle:
+        # Look up the wanted sheet by name, so that no other sheet's
+        # rows are read.  (It is looked up among the worksheets
+        # themselves, because wb.sheetnames also lists chartsheets.)
+        sheets = [ s for s in sheets if s.title.strip() == wantedTitle ][ : 1]
+    for s in sheets:
         # Info(f"Sheet: '{s.title} type of s: {repr(type(s))}'\n")
         title = s.title.strip()
         if wantedTitle:
-            if title == wantedTitle:
-                sheet = s
-            else:
-                # Info(f"Skipping unwanted sheet: '{s.title}'\n")
-                continue
-        TrimSheet(s, maxColumns, file)
+            sheet = s
+        if wb.read_only:
+            # A read-only sheet cannot be trimmed in place, but its
+            # values are trimmed by CleanRows anyway.
+            rows = ReadOnlySheetValues(s, maxColumns, file)
+        else:
+            TrimSheet(s, maxColumns, file)
+            rows = s.iter_rows(values_only=True)
         # Get the rows of cells:
-        rows = [ [str(Value(v)).strip() for v in valuesRow] for valuesRow in s.values ]
+        rows = CleanRows(rows)
         # Info(f"file: '{file}' c.value rows: \n{repr(rows)} \n")
-        TrimAndPad(rows)
-        NoTabs(rows)
         # Look for the header row.
         iHeaders, possibleKeys = GuessHeaderRow(rows, key, title)
         allPossibleKeys.update(possibleKeys)
@@ -371,9 +411,13 @@ def FindTable(wb, wantedTitle, key, file, maxColumns):
 ##################### RemoveTrailingEmpties #####################
 def RemoveTrailingEmpties(items):
     ''' Remove trailing empty items from the given list of items,
-    returning a new resulting list.
+    returning a new resulting list.  The items must be strings
+    without tabs, as made by CleanRows.
     '''
-    nItems = next( (i+1 for i in range(len(items)-1, -1, -1) if items[i]), 0 )
+    # Let join and rstrip find the last non-empty item in C: each tab 
+    # left in the joined line separates two of the items to keep.
+    line = "\t".join(items).rstrip("\t")
+    nItems = (line.count("\t") + 1 if line else 0)
     return items[0 : nItems]
 
 ##################### CompareLeadingTrailingRows #####################
@@ -383,24 +427,23 @@ def CompareLeadingTrailingRows(diffRows, oldRows, iOldStart, nOldRows, newRows,
     Modifies diffRows in place.
     '''
     # sys.stderr.write(f"CompareLeadingTrailingRows\n")
-    # Concatenate the cells in each row, separated by tabs.
-    oldLeadingLines = [ "\t".join( RemoveTrailingEmpties(oldRows[i]) ) for i in range(iOldStart, nOldRows) ]
-    newLeadingLines = [ "\t".join( RemoveTrailingEmpties(newRows[i]) ) for i in range(iNewStart, nNewRows) ]
-    rawDiffs = diff(oldLeadingLines, newLeadingLines)
+    # Diff the rows as tuples of cells, so that each diff item is
+    # already the row's cells and need not be joined and split again.
+    oldLeadingRows = [ tuple( RemoveTrailingEmpties(oldRows[i]) ) for i in range(iOldStart, nOldRows) ]
+    newLeadingRows = [ tuple( RemoveTrailingEmpties(newRows[i]) ) for i in range(iNewStart, nNewRows) ]
+    rawDiffs = diff(oldLeadingRows, newLeadingRows)
     # diff returns pairs: (d, dList)
     # where:    
     #   d = diff mark: one of {=, -, +} 
-    #   dList = a list of items that were the same, deleted or added.
-    # So we need to flatten the dLists, so that we just have pairs: (d, item).
-    # flattened = [val for sublist in list_of_lists for val in sublist]
-    flatDiffs = [ (d[0], v) for d in rawDiffs for v in d[1] ]
-    nLeadingChanges = len([ d for d in flatDiffs if d[0] != '=' ])
-    # Prepend the diff mark:
-    diffLeadingLines = [ d[0] + "\t" + d[1] for d in flatDiffs ]
-    for line in diffLeadingLines:
-        partialRow = line.split("\t")
-        diffRow = [ (partialRow[i] if i < len(partialRow) else '') for i in range(nDiffHeaders+1) ]
-        diffRows.append(diffRow)
+    #   dList = a list of rows that were the same, deleted or added.
+    nLeadingChanges = 0
+    for d, dList in rawDiffs:
+        if d != '=':
+            nLeadingChanges += len(dList)
+        for row in dList:
+            # Prepend the diff mark and pad (or cut) to nDiffHeaders cells:
+            diffRow = ( d, *row[:nDiffHeaders], *( [ '' ] * (nDiffHeaders - len(row)) ) )
+            diffRows.append(diffRow)
     # sys.stderr.write(f"diffRows:\n{repr(diffRows)}\n")
     return nLeadingChanges
 
@@ -414,13 +457,13 @@ def CompareHeaders(oldHeaders, oldHeaderIndex, newHeaders, newHeaderIndex):
     '''
     # Headers are treated as column keys: they must be unique.
     # Warn(f"in CompareHeaders oldHeaders: {repr(oldHeaders)}")
-    if '' in oldHeaders:
-        iEmpty = next( (i for i in range(len(oldHeaders)) if oldHeaders[i] == ''), -1 )
-        letter = openpyxl.utils.cell.get_column_letter(iEmpty+1)
+    iEmpty = next( (i for i, h in enumerate(oldHeaders) if h == ''), -1 )
+    if iEmpty >= 0:
+        letter = get_column_letter(iEmpty+1)
         raise Exception(f"Empty header in column {letter} of old table\n")
-    if '' in newHeaders:
-        iEmpty = next( (i for i in range(len(newHeaders)) if newHeaders[i] == ''), -1 )
-        letter = openpyxl.utils.cell.get_column_letter(iEmpty+1)
+    iEmpty = next( (i for i, h in enumerate(newHeaders) if h == ''), -1 )
+    if iEmpty >= 0:
+        letter = get_column_letter(iEmpty+1)
         raise Exception(f"Empty header in column {letter} of new table\n")
     assert(len(oldHeaders) == len(set(oldHeaders)))
     assert(len(newHeaders) == len(set(newHeaders)))
@@ -452,6 +495,25 @@ def CompareHeaders(oldHeaders, oldHeaderIndex, newHeaders, newHeaderIndex):
     assert(len(diffHeaders) == len(diffHeaderMarks))
     return diffHeaderMarks, diffHeaders
 
+##################### MakeDiffRowMaker #####################
+def MakeDiffRowMaker(firstProj, secondProj):
+    ''' Return a function f(mark, firstRow, secondRow) that makes a
+    diffRow tuple: mark followed by one cell per diffHeader.  Cell j is
+    firstRow[firstProj[j]], or if firstProj[j] is -1, secondRow[secondProj[j]],
+    or if that is -1 too, ''.  Pass [] as secondProj if there is no
+    secondRow.  The function is generated from source code, so the
+    projection is worked out once per table instead of once per cell.
+    '''
+    cells = []
+    for j, jFirst in enumerate(firstProj):
+        jSecond = secondProj[j] if secondProj else -1
+        if jFirst >= 0:     cells.append(f"a[{jFirst}]")
+        elif jSecond >= 0:  cells.append(f"b[{jSecond}]")
+        else:               cells.append("''")
+    # The trailing comma makes a tuple even when there are no cells.
+    source = f"lambda mark, a, b=None: ( mark, {', '.join(cells)}, )"
+    return eval(source)
+
 ##################### CompareBody #####################
 def CompareBody(diffRows, diffHeaders, ignoreHeaders,
         oldRows, oldHeaders, iOldHeaders, iOldTrailing, oldHeaderIndex, jOldKey,
@@ -461,45 +523,50 @@ def CompareBody(diffRows, diffHeaders, ignoreHeaders,
     will be one of {=, -, +, c-, c+}.
     '''
     iFirstBodyRow = len(diffRows)
-    # Make lists of oldKeys and newKeys.
-    oldKeys = [ oldRows[i][jOldKey] for i in range(iOldHeaders+1, iOldTrailing) ]
     # oldKeyIndex will index directly into oldRows, which means that
-    # the index is offset by iOldHeaders+1, to get past the leading lines
-    # and the header row.
+    # the index includes the offset of iOldHeaders+1, to get past the 
+    # leading lines and the header row.  Its keys are in table order.
     oldKeyIndex = {}
-    for i, v in enumerate(oldKeys):
-        r = i+iOldHeaders+1 
+    for r in range(iOldHeaders+1, iOldTrailing):
+        v = oldRows[r][jOldKey]
         if v == '':
             raise Exception(f"Table in oldFile contains an empty key at row {r+1}\n")
-        if v in oldKeyIndex:
+        if oldKeyIndex.setdefault(v, r) != r:
             raise Exception(f"Table in oldFile contains a duplicate key on row {r+1}: '{v}'\n")
-        oldKeyIndex[v] = r
     # sys.stderr.write(f"jNewKey: {jNewKey} iNewHeaders: {iNewHeaders} iNewTrailing: {iNewTrailing}\n")
-    newKeys = [ newRows[i][jNewKey] for i in range(iNewHeaders+1, iNewTrailing) ]
     # newKeyIndex will index directly into newRows, which means that
-    # the index is offset by iNewHeaders+1, to get past the leading lines
-    # and the header row.
+    # the index includes the offset of iNewHeaders+1, to get past the 
+    # leading lines and the header row.  Its keys are in table order.
     newKeyIndex = {}
-    for i, v in enumerate(newKeys):
-        r = i+iNewHeaders+1 
+    for r in range(iNewHeaders+1, iNewTrailing):
+        v = newRows[r][jNewKey]
         if v == '':
             raise ValueError(f"[INTERNAL ERROR] Table in newFile contains an empty key at row {r+1}\n")
-        if v in newKeyIndex:
+        if newKeyIndex.setdefault(v, r) != r:
             raise Exception(f"Table in newFile contains a duplicate key on row {r+1}: '{v}'\n")
-        newKeyIndex[v] = r
+    # oldProj and newProj give the column index in oldRows and newRows
+    # of each of the diffHeaders, or -1 if the column is not there.
+    oldProj = [ oldHeaderIndex.get(h, -1) for h in diffHeaders ]
+    newProj = [ newHeaderIndex.get(h, -1) for h in diffHeaders ]
+    # Functions to make a diffRow from the old and/or new row.  A changed
+    # row gets the old value of a deleted column in both its c- and
+    # c+ rows, and the new value of an added column in both too.
+    makeOldDiffRow = MakeDiffRowMaker(oldProj, newProj)
+    makeNewDiffRow = MakeDiffRowMaker(newProj, oldProj)
+    makeDeletedDiffRow = MakeDiffRowMaker(oldProj, [])
+    makeAddedDiffRow = MakeDiffRowMaker(newProj, [])
     # Make the diff list of rows.
     # diffRows will not include the header row, but each row in it
     # will have a diff mark {-, +, c-, c+} as its first item.
-    # First copy any initial deleted rows
+    # The rows are never modified after they are made, so they are
+    # made as tuples, which are smaller than lists.
+    # First copy any initial deleted rows, i.e., the old rows before the
+    # first old row that is also in newRows.  (Deleted rows after that 
+    # one are copied below, following the old row that precedes them.)
     # sys.stderr.write(f"diffHeaders: {repr(diffHeaders)}\n")
-    for k in oldKeys:
-        if k not in newKeyIndex:
-            oldRow = oldRows[oldKeyIndex[k]]
-            oldDiffRow = [ '-' ]
-            oldDiffRow.extend( [ (oldRow[oldHeaderIndex[h]] if h in oldHeaderIndex else '') for h in diffHeaders ] )
-            diffRows.append(oldDiffRow)
-        else:
-            break
+    iFirstShared = next( (r for k, r in oldKeyIndex.items() if k in newKeyIndex), iOldTrailing )
+    diffRows.extend( [ makeDeletedDiffRow('-', oldRows[r])
+        for r in range(iOldHeaders+1, iFirstShared) ] )
     # Remove from commonHeaders columns that should be ignored:
     commonHeaders = set(oldHeaderIndex.keys()).intersection(set(newHeaderIndex.keys()))
     # sys.stderr.write(f"commonHeaders: {repr(commonHeaders)}\n")
@@ -510,58 +577,47 @@ def CompareBody(diffRows, diffHeaders, ignoreHeaders,
         raise Exception(f"Bad --ignore column name(s): {h}\n"
             + f" Column headers specified with --ignore must exist in both old and new tables\n")
     compareHeaders = commonHeaders.difference(ignoreSet)
+    # cmpPairs has the old and new column indexes of compareHeaders,
+    # in old column order rather than set order, so that the rows are
+    # compared in the same order on every run:
+    cmpPairs = [ (jOld, newHeaderIndex[h]) for jOld, h in enumerate(oldHeaders) if h in compareHeaders ]
+    # oldCmp and newCmp pick out the values to compare from an old or
+    # new row, so that the rows can be compared in C instead of by
+    # a python loop.  itemgetter needs at least one index.
+    oldCmp = newCmp = lambda row: ()
+    if cmpPairs:
+        oldCmp = operator.itemgetter(*[ jOld for jOld, jNew in cmpPairs ])
+        newCmp = operator.itemgetter(*[ jNew for jOld, jNew in cmpPairs ])
     # Now copy the newRows into diffRows, marking each diff row 
     # as one of {=, -, +, c-, c+}.  Each time a new row has
     # a corresponding old row that has any deleted rows after it,
     # also copy them in.  
-    for ii, k in enumerate(newKeys):
-        i = ii+iNewHeaders+1
+    for k, i in newKeyIndex.items():
         newRow = newRows[i]
-        newDiffRow = [ '+' ]    # This might later become = or c+
-        newDiffRowValues = [ (newRow[newHeaderIndex[h]] if h in newHeaderIndex else '') for h in diffHeaders ]
-        newDiffRow.extend(newDiffRowValues)
         if k in oldKeyIndex:
             # Key k is in both oldRows and newRows.  
             oldRow = oldRows[oldKeyIndex[k]]
-            # Include old values:
-            for j, h in enumerate(diffHeaders):
-                if h in oldHeaderIndex and h not in newHeaderIndex:
-                    newDiffRow[j+1] = oldRow[oldHeaderIndex[h]]
             # Did the rows change (excluding added/deleted columns)?
-            isEqual = next( (False for h in compareHeaders if oldRow[oldHeaderIndex[h]] != newRow[newHeaderIndex[h]]), True )
+            isEqual = ( oldCmp(oldRow) == newCmp(newRow) )
             if isEqual:
                 # No values changed in columns that are in common in this row.
                 # Only add one row to diffRows.
-                newDiffRow[0] = '='     # Change the marker
-                diffRows.append(newDiffRow)
+                diffRows.append( makeNewDiffRow('=', newRow, oldRow) )
             else:
                 # Values changed from oldRow to newRow.  
-                oldDiffRow = [ 'c-' ]
-                for h in diffHeaders:
-                    v = ''
-                    if h in newHeaderIndex: v = newRow[newHeaderIndex[h]]
-                    if h in oldHeaderIndex: v = oldRow[oldHeaderIndex[h]]
-                    oldDiffRow.append(v)
-                diffRows.append(oldDiffRow)
-                newDiffRow[0] = 'c+'     # Change the marker
-                diffRows.append(newDiffRow)
+                # Every diffHeader is in oldHeaders or newHeaders (or both):
+                diffRows.append( makeOldDiffRow('c-', oldRow, newRow) )
+                diffRows.append( makeNewDiffRow('c+', newRow, oldRow) )
             # Also add any following deleted old rows.
             for j in range(oldKeyIndex[k]+1, iOldTrailing):
-                if oldKeys[j - (iOldHeaders+1)] in newKeyIndex:
+                if oldRows[j][jOldKey] in newKeyIndex:
                     break
-                oldRow = oldRows[j]
-                oldDiffRow = [ '-' ]
-                oldDiffRowValues = [ (oldRow[oldHeaderIndex[h]] if h in oldHeaderIndex else '') for h in diffHeaders ]
-                oldDiffRow.extend(oldDiffRowValues)
-                diffRows.append(oldDiffRow)
+                diffRows.append( makeDeletedDiffRow('-', oldRows[j]) )
             # Finished k in oldKeyIndex
         else:
             # k is not in oldKeyIndex.  k is a new key.
-            newDiffRow = [ '+' ]    # This might later become = or c+
-            newDiffRowValues = [ (newRow[newHeaderIndex[h]] if h in newHeaderIndex else '') for h in diffHeaders ]
-            newDiffRow.extend( newDiffRowValues )
-            diffRows.append(newDiffRow)
-        # end of loop: for ii, k in enumerate(newKeys):
+            diffRows.append( makeAddedDiffRow('+', newRow) )
+        # end of loop: for k, i in newKeyIndex.items():
     # sys.stderr.write(f"diffRows: \n{repr(diffRows)}\n")
     # Count the changes:
     nBodyChanges = 0
@@ -619,10 +675,10 @@ def CompareTables(oldRows, iOldHeaders, iOldTrailing, jOldKey,
     # And they must not contain any empty header.
     oldHeaders = oldRows[iOldHeaders]
     # Warn(f"oldHeaders: {repr(oldHeaders)}")
-    oldHeaderIndex = { v: i for i, v in enumerate(oldHeaders) }
+    oldHeaderIndex = HeaderIndex(oldHeaders)
     newHeaders = newRows[iNewHeaders]
     # Warn(f"newHeaders: {repr(newHeaders)}")
-    newHeaderIndex = { v: i for i, v in enumerate(newHeaders) }
+    newHeaderIndex = HeaderIndex(newHeaders)
     diffHeaderMarks, diffHeaders = CompareHeaders(oldHeaders, oldHeaderIndex, newHeaders, newHeaderIndex)
     # Info(f"diffHeaders: {repr(diffHeaders)}")
     # nDiffHeaders does not include the marker column.
@@ -647,16 +703,13 @@ def CompareTables(oldRows, iOldHeaders, iOldTrailing, jOldKey,
     if len(diffHeaders) == len(oldHeaders) and len(diffHeaders) == len(newHeaders):
         # No columns were added or deleted.
         iDiffBody = iDiffHeaders + 1    # Only one header row after all
-        diffRow = [ '=' ]
-        diffRow.extend(diffHeaders)
+        diffRow = ( '=', *diffHeaders )
         diffRows.append(diffRow)
     else:
         # At least one column was added or deleted.
-        oldDiffRow = [ 'c-' ]
-        oldDiffRow.extend( [ (oldHeaders[oldHeaderIndex[h]] if h in oldHeaderIndex else '') for h in diffHeaders ] )
+        oldDiffRow = ( 'c-', *[ (oldHeaders[oldHeaderIndex[h]] if h in oldHeaderIndex else '') for h in diffHeaders ] )
         diffRows.append(oldDiffRow)
-        newDiffRow = [ 'c+' ]
-        newDiffRow.extend( [ (newHeaders[newHeaderIndex[h]] if h in newHeaderIndex else '') for h in diffHeaders ] )
+        newDiffRow = ( 'c+', *[ (newHeaders[newHeaderIndex[h]] if h in newHeaderIndex else '') for h in diffHeaders ] )
         diffRows.append(newDiffRow)
         # Skip the marker column in counting column changes:
         columnChanges = [ j for j in range(1, len(oldDiffRow)) if oldDiffRow[j] != newDiffRow[j] ]
@@ -677,16 +730,27 @@ def CompareTables(oldRows, iOldHeaders, iOldTrailing, jOldKey,
     nChanges += nTrailingChanges
     return diffRows, iDiffHeaders, iDiffBody, iDiffTrailing, nChanges
 
-##################### Value #####################
-def Value(v):
-    ''' Default to the empty string if v is None.
-    '''
-    return '' if v is None else v
-
 ##################### CopyCellAttributes #####################
-def CopyCellAttributes(toCell, fromCell):
+def CopyCellAttributes(toCell, fromCell, copiedStyles):
     ''' Copy openpyxl cell attributes fromCell toCell.
+    copiedStyles must be a dict that is made afresh for each output
+    workbook, whose fromCells all come from one workbook.
+    It remembers the style that each fromCell style gave a toCell,
+    so that each different style is only copied once.
     '''
+    # This reads and sets the cells' private _style, which holds
+    # indexes into the workbook's lists of styles, fills, etc. (or is
+    # None if the cell was never styled).  openpyxl has no public way
+    # to copy a whole style at once, and _style is safe to use here
+    # because openpyxl is pinned to 3.1.3 in pyproject.toml.  With one
+    # fromCell workbook and one toCell workbook, a toCell copied from
+    # the same fromCell _style always ends up with the same _style.
+    fromStyle = fromCell._style
+    key = None if fromStyle is None else tuple(fromStyle)
+    toStyle = copiedStyles.get(key)
+    if toStyle is not None:
+        toCell._style = copy.copy(toStyle)
+        return
     # For some unknown reason, 'style' messes up date formats
     # and fills if it is set *after* setting number_format.
     # IDK if it does anything if it is set before, but here it is.
@@ -694,6 +758,7 @@ def CopyCellAttributes(toCell, fromCell):
     toCell.fill = copy.copy(fromCell.fill)
     toCell.font = copy.copy(fromCell.font)
     toCell.number_format = copy.copy(fromCell.number_format)
+    copiedStyles[key] = copy.copy(toCell._style)
 
 ##################### NewAppendTable #####################
 def NewAppendTable(oldWb, oldSheet, iOldHeaders, iOldTrailing, jOldKey,
@@ -711,6 +776,8 @@ def NewAppendTable(oldWb, oldSheet, iOldHeaders, iOldTrailing, jOldKey,
     outWb = openpyxl.Workbook()
     outWb.iso_dates = True
     outSheet = outWb.active
+    # The styles copied into outWb, for CopyCellAttributes:
+    copiedStyles = {}
     oldCellRows = tuple(oldSheet.rows)
     newCellRows = tuple(newSheet.rows)
     nOldRows = len(oldCellRows)
@@ -720,61 +787,75 @@ def NewAppendTable(oldWb, oldSheet, iOldHeaders, iOldTrailing, jOldKey,
     nOldHeaders = len(oldHeaderCells)
     nNewHeaders = len(newHeaderCells)
     ##### First copy all oldRows (including headers) before the table body
+    # Each row is made as a list of cells and added with one append
+    # call, instead of a call to outSheet.cell for every cell.
     # iOut is the 0-based row index in outSheet where we'll be writing:
     iOut = 0
     for iOld in range(iOldHeaders+1):
-        for jOld in range(nOldHeaders):
-            oldCell = oldSheet.cell(iOld+1, jOld+1)
-            c = outSheet.cell(iOut+1, jOld+1, copy.copy(oldCell.value))
-            CopyCellAttributes(c, oldCell)
+        outRow = []
+        for oldCell in oldCellRows[iOld]:
+            c = Cell(outSheet, value=copy.copy(oldCell.value))
+            CopyCellAttributes(c, oldCell, copiedStyles)
+            outRow.append(c)
+        outSheet.append(outRow)
         iOut += 1
     iOutHeaders = iOut-1
     assert( iOutHeaders == iOldHeaders )
     ##### Make a new row for any initial newRows that are not in oldRows:
-    oldKeyIndex = { oldSheet.cell(i+1, jOldKey+1).value: i for i in range(iOldHeaders+1, iOldTrailing) }
-    newKeyIndex = { newSheet.cell(i+1, jNewKey+1).value: i for i in range(iNewHeaders+1, iNewTrailing) }
+    oldKeyIndex = { oldCellRows[i][jOldKey].value: i for i in range(iOldHeaders+1, iOldTrailing) }
+    newKeyIndex = { newCellRows[i][jNewKey].value: i for i in range(iNewHeaders+1, iNewTrailing) }
     for iNew in range(iNewHeaders+1, iNewTrailing):
-        kNew = newSheet.cell(iNew+1, jNewKey+1).value
+        kNew = newCellRows[iNew][jNewKey].value
         if kNew in oldKeyIndex: break
         # sys.stderr.write(f"Making row for kNew: {repr(kNew)}\n")
         # kNew is not in oldRows.  Make a new row for it.
+        outRow = []
         for jOld in range(nOldHeaders):
             v = ''
             if jOld == jOldKey: v = kNew
-            c = outSheet.cell(iOut+1, jOld+1, v)
+            c = Cell(outSheet, value=v)
             c.fill = fillAddRow
+            outRow.append(c)
+        outSheet.append(outRow)
         iOut += 1
     ##### Found the first shared row.  
     # Now, starting with the first oldRow that is also in newRows,
     # copy oldRows that are also in newRows, but keep them in the
     # oldRows order.
     for iOld in range(iOldHeaders+1, iOldTrailing):
-        kOld = oldSheet.cell(iOld+1, jOldKey+1).value
+        kOld = oldCellRows[iOld][jOldKey].value
         # Ignore oldRows that are not in newRows:
         if kOld not in newKeyIndex: continue
         # This row is in both.  Copy it.
-        for jOld in range(nOldHeaders):
-            oldCell = oldSheet.cell(iOld+1, jOld+1)
-            c = outSheet.cell(iOut+1, jOld+1, copy.copy(oldCell.value))
-            CopyCellAttributes(c, oldCell)
+        outRow = []
+        for oldCell in oldCellRows[iOld]:
+            c = Cell(outSheet, value=copy.copy(oldCell.value))
+            CopyCellAttributes(c, oldCell, copiedStyles)
+            outRow.append(c)
+        outSheet.append(outRow)
         iOut += 1
         # Now make a new row for each following newRow that is not in oldRows.
         for iNew in range(newKeyIndex[kOld]+1, iNewTrailing):
-            kNew = newSheet.cell(iNew+1, jNewKey+1).value
+            kNew = newCellRows[iNew][jNewKey].value
             if kNew in oldKeyIndex: break
+            outRow = []
             for jOld in range(nOldHeaders):
                 v = ''
                 if jOld == jOldKey: v = kNew
-                c = outSheet.cell(iOut+1, jOld+1, v)
+                c = Cell(outSheet, value=v)
                 c.fill = fillAddRow
+                outRow.append(c)
+            outSheet.append(outRow)
             iOut += 1
     iOutTrailing = iOut
     ##### Copy any trailing oldRows.
     for iOld in range(iOldTrailing, nOldRows):
-        for jOld in range(nOldHeaders):
-            oldCell = oldSheet.cell(iOld+1, jOld+1)
-            c = outSheet.cell(iOut+1, jOld+1, copy.copy(oldCell.value))
-            CopyCellAttributes(c, oldCell)
+        outRow = []
+        for oldCell in oldCellRows[iOld]:
+            c = Cell(outSheet, value=copy.copy(oldCell.value))
+            CopyCellAttributes(c, oldCell, copiedStyles)
+            outRow.append(c)
+        outSheet.append(outRow)
         iOut += 1
     assert( iOut == nOldRows - (iOldTrailing - iOldHeaders) + (iNewTrailing - iNewHeaders) )
     ##### Now can can use OldAppendTable to append the newRows, 
@@ -793,7 +874,7 @@ def CellToString(cell):
     return str(v).strip()
 
 ##################### GrabTable #####################
-def GrabTable(oldWb, oldSheet, iOldHeaders, iOldTrailing, jOldKey,
+def GrabTable(oldWb, oldSheet, oldRows, iOldHeaders, iOldTrailing, jOldKey,
         grabHeaders, outFile, filter):
     ''' Grab wanted columns and output them 
     (with header row) as CSV to stdout.  grabHeaders specifies
@@ -808,35 +889,43 @@ def GrabTable(oldWb, oldSheet, iOldHeaders, iOldTrailing, jOldKey,
     nWanted = len(wantedList)
     if not nWanted:
         raise Exception(f"--grab option did not specify any column names")
+    # Only cell values are used, and oldRows already holds them as
+    # trimmed strings, so the sheet itself need not be read again.
+    oldValueRows = oldRows[iOldHeaders : iOldTrailing]
     # Get the old headers
-    oldCellRows = tuple(oldSheet.rows)
-    oldHeaderCells = oldCellRows[iOldHeaders]   # Tuple
-    nOldHeaders = len(oldHeaderCells)
-    oldHeaders = [ CellToString(c) for c in oldHeaderCells ]
-    oldHeaderIndex = { oldHeaders[i]: i for i in range(nOldHeaders) }
+    oldHeaders = oldValueRows[0]
+    oldHeaderIndex = HeaderIndex(oldHeaders)
+    # Compile the filter once, instead of on every row.  rowValues and
+    # env are also made once, and their values are replaced on every row.
+    if filter: filter = compile(filter, '--filter', 'eval')
+    rowValues = {}
+    env = {}
+    # Look up the wanted columns once:
+    for h in wantedList:
+        if h not in oldHeaderIndex:
+            raise Exception(f"Column '{h}' not found in old sheet '{oldSheet.title}'")
+    jWantedList = [ oldHeaderIndex[h] for h in wantedList ]
     nRows = -1
-    for i in range(iOldHeaders, iOldTrailing):
-        row = [ CellToString(c) for c in oldCellRows[i] ]
-        # Make v be a dictionary that maps the column name to the value
-        assert(len(row) == len(oldHeaders))
-        v =   { oldHeaders[j]: row[j] for j in range(len(oldHeaders)) }
-        env = { oldHeaders[j]: row[j] for j in range(len(oldHeaders)) }
-        # If a column name is not a permissible variable name in python,
-        # the value can be accessed by v['bad-var-name']:
-        env['v'] = v
-        if i>iOldHeaders and filter and not(eval(filter, env)): continue
-        for jWanted in range(nWanted):
-            h = wantedList[jWanted]
-            if h not in oldHeaderIndex:
-                raise Exception(f"Column '{h}' not found in old sheet '{oldSheet.title}'")
-            j = oldHeaderIndex[h]
-            v = CellToString(oldCellRows[i][j])
+    for i, valueRow in enumerate(oldValueRows, iOldHeaders):
+        if i>iOldHeaders and filter:
+            # Make rowValues be a dictionary that maps the column name to the value
+            assert(len(valueRow) == len(oldHeaders))
+            rowValues.update(zip(oldHeaders, valueRow))
+            env.update(rowValues)
+            # If a column name is not a permissible variable name in python,
+            # the value can be accessed by v['bad-var-name']:
+            env['v'] = rowValues
+            if not(eval(filter, env)): continue
+        safeValues = []
+        for j in jWantedList:
+            v = valueRow[j]
             # print(f"i: {i} v: {repr(v)}")
             # return
-            safeV = re.sub(r'[,\t\n]', ' ', v)
-            sys.stdout.write(safeV)
-            if jWanted < nWanted-1: sys.stdout.write(',')
-            else: sys.stdout.write('\n')
+            # Chained replace is faster than re.sub or translate here:
+            safeV = v.replace(',', ' ').replace('\t', ' ').replace('\n', ' ')
+            safeValues.append(safeV)
+        # Write the whole line at once:
+        sys.stdout.write(",".join(safeValues) + "\n")
         nRows += 1
     Info(f"Wrote {nRows} rows (plus header)\n\n")
 
@@ -866,11 +955,10 @@ def OldAppendTable(oldWb, oldSheet, iOldHeaders, iOldTrailing, jOldKey,
     # Set this again, in case they changed from adding columns:
     oldCellRows = tuple(oldSheet.rows)
     oldHeaderCells = oldCellRows[iOldHeaders]   # Tuple
-    # Get the old and new key columns
-    oldCellColumns = tuple(oldSheet.columns)
-    newCellColumns = tuple(newSheet.columns)
-    oldKeyColumn = oldCellColumns[jOldKey]
-    newKeyColumn = newCellColumns[jNewKey]
+    # Get the old and new key columns from the rows, instead of
+    # making every column of both sheets:
+    oldKeyColumn = [ r[jOldKey] for r in oldCellRows ]
+    newKeyColumn = [ r[jNewKey] for r in newCellRows ]
     # Make a newKeyIndex, to look up new rows from old keys
     newKeyIndex = { newKeyColumn[i].value: i for i in range(iNewHeaders+1, iNewTrailing) }
     # Copy existing newRows into oldRows
@@ -918,9 +1006,8 @@ def RenameTable(oldWb, oldSheet, oldRows, iOldHeaders, iOldTrailing, jOldKey,
     # that we want, rename the desired columns, and then write it out.
     oldCellRows = tuple(oldSheet.rows)
     oldHeaderCells = oldCellRows[iOldHeaders]   # Tuple
-    nOldHeaders = len(oldHeaderCells)
     oldHeaders = [ CellToString(c) for c in oldHeaderCells ]
-    oldHeaderIndex = { oldHeaders[i]: i for i in range(nOldHeaders) }
+    oldHeaderIndex = HeaderIndex(oldHeaders)
     for oldNew in renameColumns:
         oldNewList = [ h.strip() for h in oldNew.split('=') ]
         if len(oldNewList) != 2: raise Exception(f"Bad 'OLD=NEW' syntax in --rename option: '{oldNew}'")
@@ -954,61 +1041,82 @@ def SelectTable(oldWb, oldSheet, oldRows, iOldHeaders, iOldTrailing, jOldKey,
     can be accessed like this: v['my-bad-column-name']
     '''
     # The strategy is to make a new worksheet having the resulting rows
-    # that we want, delete unwanted columns, and then write it out.
-    outWb = openpyxl.Workbook()
+    # and columns that we want, and then write it out.  The worksheet
+    # is made in write_only mode, which streams the rows out instead of
+    # keeping them all in memory, so the wanted columns are decided first.
+    outWb = openpyxl.Workbook(write_only=True)
     outWb.iso_dates = True
-    outSheet = outWb.active
+    outSheet = outWb.create_sheet()
+    # The styles copied into outWb, for CopyCellAttributes:
+    copiedStyles = {}
     oldCellRows = tuple(oldSheet.rows)
     nOldRows = len(oldCellRows)
     oldHeaderCells = oldCellRows[iOldHeaders]   # Tuple
     nOldHeaders = len(oldHeaderCells)
     oldHeaders = [ CellToString(c) for c in oldHeaderCells ]
-    oldHeaderIndex = { oldHeaders[i]: i for i in range(nOldHeaders) }
+    oldHeaderIndex = HeaderIndex(oldHeaders)
+    # Compile the filters once, instead of on every column or row.
+    if colFilter: colFilter = compile(colFilter, '--select', 'eval')
+    if rowFilter: rowFilter = compile(rowFilter, '--filter', 'eval')
+    ##### Decide which columns are wanted.
+    jWanted = []
+    env = { 'col': oldHeaderIndex }
+    for j in range(nOldHeaders):
+        env['h'] = oldHeaders[j]
+        if colFilter and not(eval(colFilter, env)): continue
+        jWanted.append(j)
     ##### First copy all oldRows (including headers) before the table body
     # iOut is the 0-based row index in outSheet where we'll be writing:
     iOut = 0
     for iOld in range(iOldHeaders+1):
-        for jOld in range(nOldHeaders):
-            oldCell = oldSheet.cell(iOld+1, jOld+1)
-            c = outSheet.cell(iOut+1, jOld+1, copy.copy(oldCell.value))
-            CopyCellAttributes(c, oldCell)
+        outRow = []
+        for jOld in jWanted:
+            oldCell = oldCellRows[iOld][jOld]
+            c = WriteOnlyCell(outSheet, copy.copy(oldCell.value))
+            CopyCellAttributes(c, oldCell, copiedStyles)
+            outRow.append(c)
+        outSheet.append(outRow)
         iOut += 1
     iOutHeaders = iOut-1
     assert( iOutHeaders == iOldHeaders )
     ##### Now copy the table body, skipping unwanted rows.
+    # v and env are made once, and their values are replaced on every row.
+    v = {}
+    env = {}
     for iOld in range(iOldHeaders+1, iOldTrailing):
-        kOld = oldSheet.cell(iOld+1, jOldKey+1).value
         #### Skip unwanted row
-        row = [ CellToString(c) for c in oldCellRows[iOld] ]
-        # Make v be a dictionary that maps the column name to the value
-        assert(len(row) == len(oldHeaders))
-        v =   { oldHeaders[j]: row[j] for j in range(len(oldHeaders)) }
-        env = { oldHeaders[j]: row[j] for j in range(len(oldHeaders)) }
-        # If a column name is not a permissible variable name in python,
-        # the value can be accessed by v['bad-var-name']:
-        env['v'] = v
-        if iOld>iOldHeaders and rowFilter and not(eval(rowFilter, env)): continue
+        if rowFilter:
+            # Only the filter needs the row as strings.
+            # (CellToString is inlined here, to save a call per cell.)
+            row = [ ('' if c.value is None else str(c.value).strip()) for c in oldCellRows[iOld] ]
+            # Make v be a dictionary that maps the column name to the value
+            assert(len(row) == len(oldHeaders))
+            v.update(zip(oldHeaders, row))
+            env.update(v)
+            # If a column name is not a permissible variable name in python,
+            # the value can be accessed by v['bad-var-name']:
+            env['v'] = v
+            if not(eval(rowFilter, env)): continue
         #### The row is wanted.  Copy it.
-        for jOld in range(nOldHeaders):
-            oldCell = oldSheet.cell(iOld+1, jOld+1)
-            c = outSheet.cell(iOut+1, jOld+1, copy.copy(oldCell.value))
-            CopyCellAttributes(c, oldCell)
+        outRow = []
+        for jOld in jWanted:
+            oldCell = oldCellRows[iOld][jOld]
+            c = WriteOnlyCell(outSheet, copy.copy(oldCell.value))
+            CopyCellAttributes(c, oldCell, copiedStyles)
+            outRow.append(c)
+        outSheet.append(outRow)
         iOut += 1
     iOutTrailing = iOut
     ##### Copy any trailing oldRows.
     for iOld in range(iOldTrailing, nOldRows):
-        for jOld in range(nOldHeaders):
-            oldCell = oldSheet.cell(iOld+1, jOld+1)
-            c = outSheet.cell(iOut+1, jOld+1, copy.copy(oldCell.value))
-            CopyCellAttributes(c, oldCell)
+        outRow = []
+        for jOld in jWanted:
+            oldCell = oldCellRows[iOld][jOld]
+            c = WriteOnlyCell(outSheet, copy.copy(oldCell.value))
+            CopyCellAttributes(c, oldCell, copiedStyles)
+            outRow.append(c)
+        outSheet.append(outRow)
         iOut += 1
-    ##### Now delete unwanted columns.
-    # Delete from right to left, so that the column numbers
-    # don't change as we are deleting columns.
-    for j in range(len(oldHeaders)-1, -1, -1):
-        env = { 'h': oldHeaders[j], 'col': oldHeaderIndex }
-        if colFilter and not(eval(colFilter, env)): 
-            outSheet.delete_cols(j+1)
     ##### Write the result
     outWb.save(outFile)
     Info(f"Wrote: '{outFile}'\n\n")
@@ -1027,7 +1135,8 @@ def MergeTable(oldWb, oldSheet, oldRows, iOldHeaders, iOldTrailing, jOldKey,
     # Info(f"MergeTable n columns in oldSheet: '{len(list(oldSheet.rows)[0])}'\n")
     # Prepare to highlight the new columns.
     oldWsRows = tuple(oldSheet.rows)
-    newWsRows = tuple(newSheet.rows)
+    # Only the values of new cells are used, so their Cells are not needed:
+    newWsValueRows = tuple(newSheet.iter_rows(values_only=True))
     # newKeyIndex will be used to look up rows in newRows.
     newKeyIndex = {}
     for i in range(iNewHeaders+1, iNewTrailing):
@@ -1037,32 +1146,38 @@ def MergeTable(oldWb, oldSheet, oldRows, iOldHeaders, iOldTrailing, jOldKey,
         if v in newKeyIndex:
             raise Exception(f"Table in newFile contains a duplicate key on row {i+1}: '{v}'\n")
         newKeyIndex[v] = i
-    newHeaderIndex = { h: j for j, h in enumerate(newHeaders) }
+    newHeaderIndex = HeaderIndex(newHeaders)
+    # The old body rows, and the new row (or None) that has the same key
+    # as each one.  These are the same for every merged column, so the
+    # keys are looked up once, instead of once per merged cell.
+    oldBodyWsRows = oldWsRows[iOldHeaders+1 : iOldTrailing]
+    newBodyValueRows = [ (newWsValueRows[newKeyIndex[k]] if k in newKeyIndex else None)
+        for k in [ oldRows[i][jOldKey] for i in range(iOldHeaders+1, iOldTrailing) ] ]
     # Looping through columns first (instead of rows) because we can skip
-    # the entire column if it is not in mergeHeaders.
-    for jOld in range(len(oldHeaders)):
-        h = oldHeaders[jOld]
-        if h not in mergeHeaders: 
-            continue
-        jNew = newHeaderIndex[h]
-        for i in range(iOldHeaders+1, iOldTrailing):
-            oldRow = oldRows[i]
-            # oldRow has the string value.  Instead, compare the original
+    # the entire column if it is not in mergeHeaders.  mergeColumns
+    # pairs the old and new index of each column to be merged.
+    mergeColumns = [ (jOld, newHeaderIndex[h]) for jOld, h in enumerate(oldHeaders) if h in mergeHeaders ]
+    for jOld, jNew in mergeColumns:
+        for oldWsRow, newValueRow in zip(oldBodyWsRows, newBodyValueRows):
+            oldCell = oldWsRow[jOld]
+            # oldRows has the string value.  Instead, compare the original
             # value (with its original type).
-            oldValue = Value(oldWsRows[i][jOld].value)
-            oldKey = oldRow[jOldKey]
+            # (Value is inlined in this loop, to save a call per cell.)
+            oldValue = oldCell.value
+            if oldValue is None: oldValue = ''
             newValue = oldValue
             if optionReplace: newValue = ''
-            if oldKey in newKeyIndex:
-                newValue = Value(newWsRows[newKeyIndex[oldKey]][jNew].value)
+            if newValueRow is not None:
+                newValue = newValueRow[jNew]
+                if newValue is None: newValue = ''
             if newValue != oldValue:
-                oldWsRows[i][jOld].value = newValue
+                oldCell.value = newValue
                 if oldValue is None or oldValue == '':
                     # New value
-                    oldWsRows[i][jOld].fill = fillAddCol
+                    oldCell.fill = fillAddCol
                 else:
                     # Value changed
-                    oldWsRows[i][jOld].fill = fillChange
+                    oldCell.fill = fillChange
     # Write the output file
     # oldSheet.title += '-Merged'
     oldWb.save(outFile)
@@ -1070,10 +1185,12 @@ def MergeTable(oldWb, oldSheet, oldRows, iOldHeaders, iOldTrailing, jOldKey,
 
 ##################### FirstNonEmpty #####################
 def FirstNonEmpty(cellList):
-    ''' Return the 0-based index of the first non-empty cell, or -1.
+    ''' Return the 0-based index of the first non-empty cell in
+    cellList (which may be any iterable of cells), or -1.
     Only cell values are examined, as strings.
     '''
-    iUsed = next( (i for i in range(len(cellList)) if str(Value(cellList[i].value)).strip()  != ''), -1)
+    # (Value is inlined, to save a call per cell.)
+    iUsed = next( (i for i, c in enumerate(cellList) if c.value is not None and str(c.value).strip() != ''), -1)
     return iUsed
 
 ##################### TrimSheet #####################
@@ -1081,62 +1198,74 @@ def TrimSheet(sheet, maxColumns, filename):
     ''' Modifies the sheet in place, by trimming empty trailing 
     rows and columns.
     '''
-    rows = list(sheet.rows)
-    nRows = len(rows)
-    columns = list(sheet.columns)
-    nColumns = len(columns)
-    oldNColumns = nColumns
-    oldNRows = nRows
+    # Columns are taken from rows when needed, instead of also making
+    # every column with sheet.columns.  An empty sheet has no rows or 
+    # columns, even though its max_row and max_column are 1.
+    oldNRows = None
     if maxColumns and maxColumns < sheet.max_column:
+        # The sheet is not empty, so these are its numbers of rows and columns:
+        oldNRows = sheet.max_row
+        oldNColumns = sheet.max_column
         Info(f"File '{filename}' sheet '{sheet.title}': Deleting {sheet.max_column-maxColumns} columns due to '--maxColumns={maxColumns}'\n")
         # For safety, die if non-empty columns are found in the next two
-        # columns after maxColumns:
-        for j in range(maxColumns, maxColumns+2):
-            if j >= sheet.max_column: break
-            column = columns[j]
-            # iUsed = next( (i for i in range(nRows) if str(Value(column[i].value)).strip()  != ''), -1)
-            iUsed = FirstNonEmpty(column)
+        # columns after maxColumns.  Only those two columns are read, 
+        # before the rest are deleted, and only their values are needed:
+        lastChecked = min(maxColumns+2, sheet.max_column)
+        columns = sheet.iter_cols(min_col=maxColumns+1, max_col=lastChecked, values_only=True)
+        for j, column in enumerate(columns, maxColumns):
+            iUsed = next( (i for i, v in enumerate(column) if v is not None and str(v).strip() != ''), -1)
             if iUsed >= 0:
-                letter = openpyxl.utils.cell.get_column_letter(j+1)
+                letter = get_column_letter(j+1)
                 raise Exception(f"Non-empty column {letter} ({j+1}) found with --maxColumns={maxColumns} \n  in sheet '{sheet.title}' file '{filename}'.\n  Either delete extra columns or set maxColumns higher.")
                 break
-        sheet.delete_cols(maxColumns, sheet.max_column-maxColumns)
-        # Get these again, in case they changed:
-        columns = list(sheet.columns)
-        nColumns = len(columns)
-        rows = list(sheet.rows)
-        nRows = len(rows)
-    if nColumns > 100 and not maxColumns:
-        Warn(f"File '{filename}' sheet '{sheet.title}' has a large number of columns: {nColumns}.\n Trimming empty trailing columns may take a long time\n If you are certain that no more than N columns are used in any sheet, you can\n specify the '--maxColumns=N' option (where N is an integer) to delete\n all extra columns.")
+        # Keep columns 1..maxColumns, as ReadOnlySheetValues does:
+        sheet.delete_cols(maxColumns+1, sheet.max_column-maxColumns)
+    rows = list(sheet.rows)
+    nRows = len(rows)
+    nColumns = (len(rows[0]) if rows else 0)
+    if oldNRows is None:
+        oldNRows = nRows
+        oldNColumns = nColumns
     # sys.stderr.write(f"Trimming empty rows and columns. oldNRows: {oldNRows} oldNColumns: {oldNColumns} nRows: {nRows} nColumns: {nColumns} ...\n")
     try:
-        # Delete empty trailing rows:
-        while nRows > 0:
-            row = rows[nRows-1]
+        # Delete empty trailing rows.  Find them in the cached rows
+        # first, and then delete them all at once, because each
+        # delete_rows call rewrites the sheet's cells.
+        nUsedRows = nRows
+        while nUsedRows > 0:
+            row = rows[nUsedRows-1]
             # jUsed = next( (j for j in range(nColumns) if str(Value(row[j].value)).strip()  != ''), -1)
             jUsed = FirstNonEmpty(row)
             if jUsed >= 0: break
-            # sys.stderr.write(f"Trimming empty row: {nRows}\n")
-            sheet.delete_rows(nRows)
-            nRows -= 1
+            nUsedRows -= 1
+        if nUsedRows < nRows:
+            # sys.stderr.write(f"Trimming {nRows-nUsedRows} empty rows\n")
+            sheet.delete_rows(nUsedRows+1, nRows-nUsedRows)
+            nRows = nUsedRows
+            # The deleted rows were empty, so drop them from the cached
+            # rows too, and the column scan below can skip them:
+            del rows[nRows : ]
         if nRows == 0: nColumns = 0
     except AttributeError as e:
         raise Exception(f"AttributeError {str(e)}\n"
             + f" at sheet '{sheet.title}' row {nRows}")
     try:
-        # Delete empty trailing columns:
-        warned = False
-        while nColumns > 0:
-            column = columns[nColumns-1]
+        # Delete empty trailing columns, all at once, like the rows.
+        # (Deleting them one at a time took time proportional to the
+        # square of the number of columns.)
+        nUsedColumns = nColumns
+        while nUsedColumns > 0:
+            # The column's cells are taken lazily, so that the scan
+            # stops making them at the first non-empty one:
+            column = ( r[nUsedColumns-1] for r in rows )
             # iUsed = next( (i for i in range(nRows) if str(Value(column[i].value)).strip()  != ''), -1)
             iUsed = FirstNonEmpty(column)
             if iUsed >= 0: break
-            # sys.stderr.write(f"Trimming empty column: {nColumns}\n")
-            sheet.delete_cols(nColumns)
-            nColumns -= 1
-            if oldNColumns-nColumns >= 10 and nColumns >= 100 and not warned:
-                Warn(f"'{filename}' sheet '{sheet.title}': Trimming empty trailing columns from {oldNColumns} columns.\n If this takes too long, consider the '--maxColumns=N' option ...\n")
-                warned = True
+            nUsedColumns -= 1
+        if nUsedColumns < nColumns:
+            # sys.stderr.write(f"Trimming {nColumns-nUsedColumns} empty columns\n")
+            sheet.delete_cols(nUsedColumns+1, nColumns-nUsedColumns)
+            nColumns = nUsedColumns
         if nRows != oldNRows or nColumns != oldNColumns:
             Info(f"File '{filename}' sheet '{sheet.title}': Trimmed {oldNRows-nRows} empty trailing rows and {oldNColumns-nColumns} columns\n")
     except AttributeError as e:
@@ -1157,14 +1286,12 @@ def WriteDiffFile(diffRows, iDiffHeaders, iDiffBody, iDiffTrailing, oldKey, igno
         # two header rows instead of one.
         newHeaders = diffRows[iDiffHeaders+1]
     jKey = next( j for j in range(nColumns) if oldHeaders[j] == oldKey )
-    # Create the Excel spreadsheet and fill it with data.
-    outWb = openpyxl.Workbook()
+    # Create the Excel spreadsheet.  It is written in write_only mode,
+    # which streams the rows out instead of keeping a full worksheet
+    # in memory, so each cell must have its fill before its row is added.
+    outWb = openpyxl.Workbook(write_only=True)
     outWb.iso_dates = True
-    outSheet = outWb.active
-    # Fill the sheet with data
-    for diffRow in diffRows:
-        outSheet.append(diffRow)
-    # Make a new workbook and copy the table into it.
+    outSheet = outWb.create_sheet('Differences')
 
     # Determine column highlights for added/deleted columns. 
     # colFills will highlight added or deleted columns.
@@ -1176,39 +1303,62 @@ def WriteDiffFile(diffRows, iDiffHeaders, iDiffBody, iDiffTrailing, oldKey, igno
         # It's enough to check oldHeaders hear, because ignoreSet
         # only includes headers that are in both old and new:
         if oldHeaders[j] in ignoreSet: colFills[j] = fillIgnore
-    # Highlight the spreadsheet.
-    wsRows = tuple(outSheet.rows)
+    # Only the cells of columns without a column fill are highlighted
+    # as changed, so list those columns once:
+    jChangeable = [ j for j in range(1, nColumns) if not colFills[j] ]
+    # Fill the sheet with highlighted data.  The fills of every column
+    # are worked out once for each kind of row (in rowFills), instead
+    # of for every row.  A c+ row may highlight cells in the c- row 
+    # above it, so each row is held in prevCells until the next row 
+    # has been done.
+    rowFills = {}
+    prevCells = None
     for i, diffRow in enumerate(diffRows):
         rowMark = diffRow[0]
-        rowFill = None
-        if rowMark == '-': rowFill = fillDelRow 
-        if rowMark == '+': rowFill = fillAddRow 
-        if rowMark == 'c-' or rowMark == 'c+': rowFill = fillChangeRow 
-        if i < iDiffHeaders or i >= iDiffTrailing:
-            # This is a leading or trailing row.
-            # Only use row fills.
-            if rowFill:
+        isOutside = (i < iDiffHeaders or i >= iDiffTrailing)
+        fills = rowFills.get( (isOutside, i < iDiffBody, rowMark) )
+        if fills is None:
+            rowFill = None
+            if rowMark == '-': rowFill = fillDelRow 
+            if rowMark == '+': rowFill = fillAddRow 
+            if rowMark == 'c-' or rowMark == 'c+': rowFill = fillChangeRow 
+            fills = [ None for j in range(nColumns) ]
+            if isOutside:
+                # This is a leading or trailing row.
+                # Only use row fills.
+                if rowFill:
+                    fills = [ rowFill for j in range(nColumns) ]
+            else:
+                # This is either a header row or a body row.
+                # Apply row fills first, so they'll be overridden
+                # by column fills.
                 for j in range(nColumns):
-                    wsRows[i][j].fill = rowFill
-        else:
-            # This is either a header row or a body row.
-            # Apply row fills first, so they'll be overridden
-            # by column fills.
-            for j in range(nColumns):
-                if oldHeaders[j] == oldKey: 
-                    wsRows[i][j].fill = fillKeyCol
-                if rowMark and rowFill:
-                    wsRows[i][j].fill = rowFill
-                if i < iDiffBody:
-                    # A header row
-                    wsRows[i][j].fill = fillKeyCol
-                if colFills[j]:
-                    wsRows[i][j].fill = colFills[j]
-                if j>0 and rowMark == 'c+' and (not colFills[j]) and diffRow[j] != diffRows[i-1][j]:
+                    if oldHeaders[j] == oldKey: 
+                        fills[j] = fillKeyCol
+                    if rowMark and rowFill:
+                        fills[j] = rowFill
+                    if i < iDiffBody:
+                        # A header row
+                        fills[j] = fillKeyCol
+                    if colFills[j]:
+                        fills[j] = colFills[j]
+            rowFills[ (isOutside, i < iDiffBody, rowMark) ] = fills
+        if rowMark == 'c+' and not isOutside:
+            fills = fills.copy()
+            prevRow = diffRows[i-1]
+            for j in jChangeable:
+                if diffRow[j] != prevRow[j]:
                     # Highlight this cell and the one above it, if non-empty
-                    if diffRows[i-1][j]: wsRows[i-1][j].fill = fillDelRow
-                    if diffRows[i][j]:   wsRows[i][j].fill =   fillAddRow
-    outSheet.title = 'Differences'
+                    if prevRow[j]: prevCells[j].fill = fillDelRow
+                    if diffRow[j]: fills[j] = fillAddRow
+        cells = [ WriteOnlyCell(outSheet, value=v) for v in diffRow ]
+        for c, f in zip(cells, fills):
+            if f is not None: c.fill = f
+        if prevCells is not None:
+            outSheet.append(prevCells)
+        prevCells = cells
+    if prevCells is not None:
+        outSheet.append(prevCells)
     outWb.save(outFile)
     Info(f"Wrote: '{outFile}'\n")
 
@@ -1296,7 +1446,11 @@ def main(key=None,
     if maxColumns: maxColumns = maxColumns
     if maxColumns == -1: maxColumns = 100
     # sys.stderr.write("args: \n" + repr(args) + "\n\n")
-    oldWb = LoadWorkBook(oldFile, data_only=False)
+    # Only the values are needed to diff the tables, so the workbooks
+    # can be streamed read-only unless the sheets themselves are used.
+    readOnly = not (rename or select or oldAppend or newAppend
+        or merge or mergeAll or replace or replaceAll)
+    oldWb = LoadWorkBook(oldFile, data_only=False, read_only=readOnly)
     ####### Determine sheets to compare
     oldSheetTitles = [ s.title for s in oldWb if (not oldSheetTitle) or s.title == oldSheetTitle ]
     if not oldSheetTitles:
@@ -1328,11 +1482,11 @@ def main(key=None,
             select, outFile, filter)
         return
     if grab:
-        GrabTable(oldWb, oldSheet, iOldHeaders, iOldTrailing, jOldKey,
+        GrabTable(oldWb, oldSheet, oldRows, iOldHeaders, iOldTrailing, jOldKey,
             grab, outFile, filter)
         return
     ###### new sheet:
-    newWb = LoadWorkBook(newFile, data_only=False)
+    newWb = LoadWorkBook(newFile, data_only=False, read_only=readOnly)
     newSheetTitles = [ s.title for s in newWb if (not newSheetTitle) or s.title == newSheetTitle ]
     if not newSheetTitles:
         raise Exception(f"Sheet '{newSheetTitle}' not found in newFile: '{newFile}'")
@@ -1365,23 +1519,23 @@ def main(key=None,
         if (mergeAll or merge) and (replaceAll or replace):
             raise Exception(f"Options --merge/--mergeAll and --replace/--replaceAll cannot be used together\n")
         # sys.stderr.write(f"merge: {repr(merge)}\n")
-        oldHeadersSet = set(oldRows[iOldHeaders])
-        newHeadersSet = set(newRows[iNewHeaders])
-        mergeHeaders = set(merge or replace or [])
+        # These sets are only probed, so build each just once, as a frozenset:
+        oldHeadersSet = frozenset(oldRows[iOldHeaders])
+        newHeadersSet = frozenset(newRows[iNewHeaders])
         if mergeAll or replaceAll:
-            oldNonKeys = oldHeadersSet.difference(set([oldKey]))
-            newNonKeys = newHeadersSet.difference(set([newKey]))
-            mergeHeaders = oldNonKeys.intersection(newNonKeys)
+            oldNonKeys = oldHeadersSet - {oldKey}
+            newNonKeys = newHeadersSet - {newKey}
+            mergeHeaders = oldNonKeys & newNonKeys
         else:
+            mergeHeaders = frozenset(merge or replace)
             for h in sorted(mergeHeaders):
                 # sys.stderr.write(f"h: {repr(h)}\n")
                 if h == oldKey or h == newKey:
-                    raise Exception(f"Key columns cannot be merged: --merge={'h'}\n")
+                    raise Exception(f"Key columns cannot be merged: --merge='{h}'\n")
                 if (h not in oldHeadersSet):
                     raise Exception(f"Column specified in --merge='{h}' does not exist in old table.\n")
                 if (h not in newHeadersSet):
                     raise Exception(f"Column specified in --merge='{h}' does not exist in new table.\n")
-                mergeHeaders.add(h)
         # Merge or replace columns
         MergeTable(oldWb, oldSheet, oldRows, iOldHeaders, iOldTrailing, jOldKey,
             newSheet, newRows, iNewHeaders, iNewTrailing, jNewKey, outFile, 
@@ -1396,6 +1550,11 @@ def main(key=None,
             newSheet, iNewHeaders, iNewTrailing, jNewKey, outFile)
         return
 
+    # Everything else only needs oldRows and newRows, so close the
+    # workbooks and drop them, to free their memory before diffing.
+    oldWb.close()
+    newWb.close()
+    del oldWb, newWb, oldSheet, newSheet
     ignoreHeaders = ignore if ignore else []
     # command will be the command string to echo in the first row output.
     command = ''
@@ -1407,6 +1566,8 @@ def main(key=None,
     Info(f"{nChanges} total differences found")
     oldKey = oldRows[iOldHeaders][jOldKey]
     newKey = newRows[iNewHeaders][jNewKey]
+    # Only diffRows are needed from here on:
+    del oldRows, newRows
     if changed:
 
         WriteChanged(diffRows, iDiffHeaders, iDiffBody, iDiffTrailing, newKey, False)
@@ -1423,15 +1584,19 @@ def WriteChanged(diffRows, iDiffHeaders, iDiffBody, iDiffTrailing, newKey, union
     '''
     # Find the key column in diffRows
     diffHeaders = diffRows[iDiffBody-1] # New headers
-    jDiffKey = next( (j for j in range(1, len(diffHeaders)) if diffHeaders[j] == newKey), len(diffHeaders) )
-    assert(jDiffKey < len(diffHeaders))
-    print(newKey)
-    markersWanted = ['-', '+', 'c-']
-    if unionKeys: markersWanted = ['=', '-', '+', 'c-']
-    for i in range(iDiffBody, iDiffTrailing):
-        diffRow = diffRows[i]
-        if diffRow[0] in markersWanted:
-            print(diffRow[jDiffKey])
+    # Column 0 holds the row markers, not a header, so skip it:
+    jDiffKey = next( (j for j in range(1, len(diffHeaders)) if diffHeaders[j] == newKey), None )
+    # Not an assert, which python -O would skip, leaving the wrong column:
+    if jDiffKey is None:
+        raise Exception(f"[INTERNAL ERROR] Key column '{newKey}' not found in diff headers\n")
+    markersWanted = {'-', '+', 'c-'}
+    if unionKeys: markersWanted = {'=', '-', '+', 'c-'}
+    # Collect the lines and write them all at once, instead of
+    # printing each key separately:
+    lines = [ newKey ]
+    lines.extend( diffRows[i][jDiffKey] for i in range(iDiffBody, iDiffTrailing)
+        if diffRows[i][0] in markersWanted )
+    sys.stdout.write("\n".join(lines) + "\n")
 
 ############################################################################
 ############################## simplediff ##################################
@@ -1517,18 +1682,91 @@ def diff(old, new):
 
     '''
 
+    # Fast path: nothing changed.
+    if old == new:
+        return (new and [('=', new[ : ])] or [])
+
     # Create a map from old values to their indices
     old_index_map = dict()
     for i, val in enumerate(old):
         old_index_map.setdefault(val,list()).append(i)
 
-    # Find the largest substring common to old and new.
+    # Values that old and new have in common at the start (p of them)
+    # and at the end (s of them) can be marked unchanged without any
+    # search, but only where that cannot change the result.  If each of
+    # those values occurs just once in old and once in new, no longer
+    # common substring can include them, so the search would have kept
+    # those ends unchanged anyway.  Otherwise nothing is stripped.
+    nCommon = min(len(old), len(new))
+    p = 0
+    while p < nCommon and old[p] == new[p]:
+        p += 1
+    s = 0
+    while s < nCommon - p and old[-1 - s] == new[-1 - s]:
+        s += 1
+    if p or s:
+        new_counts = dict()
+        for val in new:
+            new_counts[val] = new_counts.get(val, 0) + 1
+        ends = [ old[i] for i in range(p) ] + [ old[i] for i in range(len(old) - s, len(old)) ]
+        if any(len(old_index_map[val]) != 1 or new_counts[val] != 1 for val in ends):
+            p = s = 0
+
+    # Rather than recursing on slices of old and new, keep a stack of
+    # the index ranges (o_lo, o_hi, n_lo, n_hi) still to be diffed, with
+    # the leftmost range on top, so that results come off in order.
+    # An ('=', values) pair on the stack is already a result.
+    result = (p and [('=', new[ : p])] or [])
+    stack = (s and [('=', new[len(new) - s : ])] or [])
+    stack.append((p, len(old) - s, p, len(new) - s))
+    # Two zeroed overlap buffers, shared by all ranges (see _find_lcs_range):
+    overlap = [ 0 ] * (len(old) + 1)
+    _overlap = [ 0 ] * (len(old) + 1)
+    while stack:
+        item = stack.pop()
+        if item[0] == '=':
+            result.append(item)
+            continue
+        o_lo, o_hi, n_lo, n_hi = item
+        sub_start_old, sub_start_new, sub_length = \
+            _find_lcs_range(old_index_map, new, o_lo, o_hi, n_lo, n_hi,
+                            overlap, _overlap)
+        if sub_length == 0:
+            # If no common substring is found, we return an insert and delete...
+            if o_lo < o_hi:
+                result.append(('-', old[o_lo : o_hi]))
+            if n_lo < n_hi:
+                result.append(('+', new[n_lo : n_hi]))
+        else:
+            # ...otherwise, the common substring is unchanged and we
+            # diff the text before and after that substring
+            stack.append((sub_start_old + sub_length, o_hi,
+                          sub_start_new + sub_length, n_hi))
+            stack.append(('=', new[sub_start_new : sub_start_new + sub_length]))
+            stack.append((o_lo, sub_start_old, n_lo, sub_start_new))
+    return result
+
+
+def _find_lcs_range(old_index_map, new, o_lo, o_hi, n_lo, n_hi, overlap, _overlap):
+    '''
+    Find the largest substring common to old[o_lo:o_hi] and new[n_lo:n_hi],
+    where old_index_map maps each value of old to its ascending indices.
+    overlap and _overlap are lists of len(old)+1 zeros, which are
+    left zeroed again on return.
+
+    Returns:
+        (sub_start_old, sub_start_new, sub_length), with indices into
+        the whole of old and new.
+    '''
     # We use a dynamic programming approach here.
     # 
-    # We iterate over each value in the `new` list, calling the
-    # index `inew`. At each iteration, `overlap[i]` is the
-    # length of the largest suffix of `old[:i]` equal to a suffix
-    # of `new[:inew]` (or unset when `old[i]` != `new[inew]`).
+    # We iterate over each value in the `new` range, calling the
+    # index `inew`. At each iteration, `overlap[i+1]` is the
+    # length of the largest suffix of `old[o_lo:i]` equal to a suffix
+    # of `new[n_lo:inew]` (or 0 when `old[i]` != `new[inew]`).
+    # `overlap[0]` stays 0, for a match at old index 0.  Only the
+    # entries listed in `dirty` are set, so only those need to be
+    # zeroed again before the buffer is reused.
     #
     # At each stage of iteration, the new `overlap` (called
     # `_overlap` until the original `overlap` is no longer needed)
@@ -1538,41 +1776,41 @@ def diff(old, new):
     # seen so far (`sub_length`), we update the largest substring
     # to the overlapping strings.
 
-    overlap = dict()
+    dirty = ()
     # `sub_start_old` is the index of the beginning of the largest overlapping
     # substring in the old list. `sub_start_new` is the index of the beginning
     # of the same substring in the new list. `sub_length` is the length that
     # overlaps in both.
     # These track the largest overlapping substring seen so far, so naturally
     # we start with a 0-length substring.
-    sub_start_old = 0
-    sub_start_new = 0
+    sub_start_old = o_lo
+    sub_start_new = n_lo
     sub_length = 0
 
-    for inew, val in enumerate(new):
-        _overlap = dict()
-        for iold in old_index_map.get(val,list()):
+    for inew in range(n_lo, n_hi):
+        indices = old_index_map.get(new[inew], ())
+        # Only the indices within [o_lo, o_hi) are in this range:
+        _dirty = indices[bisect_left(indices, o_lo) : bisect_left(indices, o_hi)]
+        for iold in _dirty:
             # now we are considering all values of iold such that
-            # `old[iold] == new[inew]`.
-            _overlap[iold] = (iold and overlap.get(iold - 1, 0)) + 1
-            if(_overlap[iold] > sub_length):
+            # `old[iold] == new[inew]`.  (overlap is only set within
+            # the range, so it is 0 before o_lo.)
+            length = overlap[iold] + 1
+            _overlap[iold + 1] = length
+            if(length > sub_length):
                 # this is the largest substring seen so far, so store its
                 # indices
-                sub_length = _overlap[iold]
+                sub_length = length
                 sub_start_old = iold - sub_length + 1
                 sub_start_new = inew - sub_length + 1
-        overlap = _overlap
+        for iold in dirty:
+            overlap[iold + 1] = 0
+        overlap, _overlap = _overlap, overlap
+        dirty = _dirty
 
-    if sub_length == 0:
-        # If no common substring is found, we return an insert and delete...
-        return (old and [('-', old)] or []) + (new and [('+', new)] or [])
-    else:
-        # ...otherwise, the common substring is unchanged and we recursively
-        # diff the text before and after that substring
-        return diff(old[ : sub_start_old], new[ : sub_start_new]) + \
-               [('=', new[sub_start_new : sub_start_new + sub_length])] + \
-               diff(old[sub_start_old + sub_length : ],
-                       new[sub_start_new + sub_length : ])
+    for iold in dirty:
+        overlap[iold + 1] = 0
+    return sub_start_old, sub_start_new, sub_length
 
 
 def string_diff(old, new):
@@ -1665,7 +1903,10 @@ def check_diff(old, new):
 ############################## main ##################################
 ############################################################################
 
-if __name__ == '__main__':
+##################### BuildArgParser #####################
+def BuildArgParser():
+    ''' Build and return the parser for the command line options.
+    '''
     # Parse command line options:
     argParser = argparse.ArgumentParser(
         description='Compare tables in two .xlsx spreadsheets',
@@ -1744,8 +1985,11 @@ in newFile.''')
                     help='''No error message, but set exit code 0 for no diffs, 2 for diffs, 1 for error''')
     argParser.add_argument('--out',
                     help='Output file of differences.  This "option" is actually REQUIRED unless the --grab option is used.')
+    return argParser
+
+if __name__ == '__main__':
     # Info(f"calling print_using....\n")
-    args = argParser.parse_args()
+    args = BuildArgParser().parse_args()
     main(key=args.key,
          oldSheet=args.oldSheet,
          newSheet=args.newSheet,